@@ -10,13 +10,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import logging
 import json
-import urllib.parse
+import time
 
 import asks
 
-from linehaul.bigquery.oauth2 import ServiceApplicationClient, TokenExpiredError
+from linehaul.bigquery.oauth2 import ServiceApplicationClient
 from linehaul.logging import SPEW as log_SPEW
 
 
@@ -26,9 +27,36 @@ GOOGLE_TOKEN_URL = "https://www.googleapis.com/oauth2/v4/token"
 BIGQUERY_SCOPE = "https://www.googleapis.com/auth/bigquery"
 
 
+# We don't need any whitespace in the request bodies that we're sending to BigQuery,
+# and with batches of hundreds of rows it adds up.
+_json_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+# Everything in an insertAll request other than the rows and the template suffix is
+# the same on every single request, so we serialize that once up front and splice the
+# rest of the request in after it.
+_INSERT_ALL_PREFIX = _json_encode(
+    {
+        "kind": "bigquery#tableDataInsertAllRequest",
+        "skipInvalidRows": True,
+        "ignoreUnknownValues": True,
+    }
+)[:-1]
+
+
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=32)
+def _table_url(base_location, target):
+    # In practice we only ever talk to one or two tables, so we cache the URL for each
+    # table rather than splitting and formatting the target on every request.
+    project_id, dataset_id, table_id = target.split(".")
+    return (
+        f"{base_location}/bigquery/v2/projects/{project_id}/datasets/{dataset_id}/"
+        f"tables/{table_id}"
+    )
+
+
 class TokenFetchError(Exception):
     def __init__(self, *args, status_code, body, **kwargs):
         super().__init__(*args, **kwargs)
@@ -46,6 +74,11 @@ class BigQueryError(Exception):
 
 
 class _BigQueryAuthentication:
+
+    # How long before our token actually expires that we'll consider it expired, this
+    # ensures that we don't attempt to use a token that will expire mid request.
+    _expiry_margin = 30
+
     def __init__(self, session, account, private_key):
         self._session = session
         self._client = ServiceApplicationClient(
@@ -54,6 +87,7 @@ class _BigQueryAuthentication:
             audience=GOOGLE_AUDIENCE,
             issuer=account,
         )
+        self._expires_at = None
 
     async def get_token(self):
         logger.debug("Fetching OAuth2 token from %r", GOOGLE_TOKEN_URL)
@@ -71,21 +105,43 @@ class _BigQueryAuthentication:
                 body=resp.text,
             )
 
+        # We know exactly what shape of response Google is going to give us, so rather
+        # than go through the generic (and validation heavy) response parsing in
+        # oauthlib, we just pull out the handful of values that we actually need.
+        token = resp.json()
+        if "access_token" not in token:
+            raise TokenFetchError(
+                f"No access token in response body: {resp.text!r}",
+                status_code=resp.status_code,
+                body=resp.text,
+            )
+
         logger.debug("Saving fetched OAuth2 token.")
-        self._client.parse_request_body_response(resp.text)
+        self._client.access_token = token["access_token"]
+
+        if token.get("expires_in") is None:
+            self._expires_at = None
+        else:
+            self._expires_at = (
+                time.time() + int(token["expires_in"]) - self._expiry_margin
+            )
+
+    def _token_expired(self):
+        return self._expires_at is not None and self._expires_at <= time.time()
 
     async def authenticate(self, url, *args, **kwargs):
         logger.log(log_SPEW, "Authenticating request for %r", url)
 
+        # We know when our token is going to expire, so rather than relying on the
+        # OAuth2 client raising a TokenExpiredError, we'll just check it ourselves
+        # and fetch a new token ahead of time.
         if not self._client.access_token:
             await self.get_token()
-
-        try:
-            return self._client.add_token(url, *args, **kwargs)
-        except TokenExpiredError:
+        elif self._token_expired():
             logger.debug("OAuth2 token expired.")
             await self.get_token()
-            return self._client.add_token(url, *args, **kwargs)
+
+        return self._client.add_token(url, *args, **kwargs)
 
 
 class BigQuery:
@@ -101,16 +157,8 @@ class BigQuery:
         self._session = asks.Session(connections=max_connections)
         self._auth = _BigQueryAuthentication(self._session, account, private_key)
 
-    def _make_url(self, path):
-        return urllib.parse.urljoin(self._base_location, path)
-
     async def get_schema(self, target):
-        project_id, dataset_id, table_id = target.split(".")
-        path = (
-            f"/bigquery/v2/projects/{project_id}/datasets/{dataset_id}/"
-            f"tables/{table_id}"
-        )
-        url = self._make_url(path)
+        url = _table_url(self._base_location, target)
         url, headers, body = await self._auth.authenticate(url, http_method="GET")
 
         resp = await self._session.get(url, headers=headers, data=body)
@@ -125,14 +173,9 @@ class BigQuery:
         return resp.json().get("schema", {}).get("fields", [])
 
     async def update_schema(self, target, schema):
-        project_id, dataset_id, table_id = target.split(".")
-        path = (
-            f"/bigquery/v2/projects/{project_id}/datasets/{dataset_id}/"
-            f"tables/{table_id}"
-        )
-        url = self._make_url(path)
+        url = _table_url(self._base_location, target)
         headers = {"Content-Type": "application/json"}
-        body = json.dumps({"schema": {"fields": schema}})
+        body = _json_encode({"schema": {"fields": schema}})
         url, headers, body = await self._auth.authenticate(
             url, http_method="PATCH", headers=headers, body=body
         )
@@ -147,22 +190,13 @@ class BigQuery:
             )
 
     async def insert_all(self, target, rows, template_suffix):
-        data = {
-            "kind": "bigquery#tableDataInsertAllRequest",
-            "skipInvalidRows": True,
-            "ignoreUnknownValues": True,
-            "templateSuffix": template_suffix,
-            "rows": rows,
-        }
-
-        project_id, dataset_id, table_id = target.split(".")
-        path = (
-            f"/bigquery/v2/projects/{project_id}/datasets/{dataset_id}/"
-            f"tables/{table_id}/insertAll"
-        )
-        url = self._make_url(path)
+        url = _table_url(self._base_location, target) + "/insertAll"
         headers = {"Content-Type": "application/json"}
-        body = json.dumps(data)
+        body = (
+            f"{_INSERT_ALL_PREFIX},"
+            f'"templateSuffix":{_json_encode(template_suffix)},'
+            f'"rows":{_json_encode(rows)}}}'
+        )
         url, headers, body = await self._auth.authenticate(
             url, http_method="POST", headers=headers, body=body
         )
@@ -10,11 +10,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import json
 import time
 
-import jwt
-
-from oauthlib.common import to_unicode
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
 from oauthlib.oauth2.rfc6749.clients.base import Client
 from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
 from oauthlib.oauth2.rfc6749.parameters import prepare_token_request
@@ -23,6 +25,34 @@ from oauthlib.oauth2.rfc6749.parameters import prepare_token_request
 __all__ = ["ServiceApplicationClient", "TokenExpiredError"]
 
 
+def _load_private_key(private_key):
+    if isinstance(private_key, str):
+        private_key = private_key.encode("utf8")
+
+    return serialization.load_pem_private_key(
+        private_key, password=None, backend=default_backend()
+    )
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+# We only ever sign with RS256, so the JWT header is always the same and we can encode
+# it once, rather than for every assertion we sign.
+_JWT_HEADER = _b64encode(
+    json.dumps({"alg": "RS256", "typ": "JWT"}, separators=(",", ":")).encode("utf8")
+)
+
+
+def _encode_jwt(claim, key):
+    payload = _b64encode(json.dumps(claim, separators=(",", ":")).encode("utf8"))
+    signing_input = _JWT_HEADER + b"." + payload
+    signature = key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+
+    return (signing_input + b"." + _b64encode(signature)).decode("ascii")
+
+
 class ServiceApplicationClient(Client):
 
     grant_type = "urn:ietf:params:oauth:grant-type:jwt-bearer"
@@ -43,6 +73,12 @@ class ServiceApplicationClient(Client):
         self.issuer = issuer
         self.audience = audience
 
+        # Parsing a PEM encoded key is relatively expensive, and our key never changes
+        # so we'll parse it once up front and sign with the already loaded key.
+        self._signing_key = (
+            None if private_key is None else _load_private_key(private_key)
+        )
+
     def prepare_request_body(
         self,
         private_key=None,
@@ -56,18 +92,24 @@ class ServiceApplicationClient(Client):
         scope=None,
         **kwargs
     ):
-        key = private_key or self.private_key
+        if private_key:
+            key = _load_private_key(private_key)
+        else:
+            key = self._signing_key
+
         if not key:
             raise ValueError(
                 "Encryption key must be supplied to make JWT token requests."
             )
 
+        now = time.time()
+
         claim = {
             "iss": issuer or self.issuer,
             "aud": audience or self.audience,
             "sub": subject,
-            "exp": int(expires_at or time.time() + 3600),
-            "iat": int(issued_at or time.time()),
+            "exp": int(expires_at if expires_at is not None else now + 3600),
+            "iat": int(issued_at if issued_at is not None else now),
             "scope": scope,
         }
 
@@ -85,8 +127,7 @@ class ServiceApplicationClient(Client):
 
         claim.update(extra_claims or {})
 
-        assertion = jwt.encode(claim, key, "RS256")
-        assertion = to_unicode(assertion)
+        assertion = _encode_jwt(claim, key)
 
         return prepare_token_request(
             self.grant_type, body=body, assertion=assertion, **kwargs
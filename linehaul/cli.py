@@ -12,32 +12,34 @@
 
 import base64
 import binascii
-import importlib_resources
 import json
 import logging
 import logging.config
 
 from functools import partial
 
-import asks
 import click
-import trio
 
-from linehaul.bigquery import BigQuery
-from linehaul.migration import migrate as migrate_
-from linehaul.server import server as server_
 
-
-SENSITIVE = {"token"}
+# Note: The imports of asks, trio, importlib_resources, and the bulk of linehaul itself
+#       are deferred until a command is actually invoked. Importing the server pulls in
+#       all of our parsers (and compiles their grammars), which we don't want to pay for
+#       just to run something like ``linehaul --help``.
 
 
-asks.init("trio")
+SENSITIVE = {"token"}
 
 
 logger = logging.getLogger(__name__)
 
 
 def _configure_bigquery(credentials_file, credentials_blob, api_max_connections=None):
+    import asks
+
+    from linehaul.bigquery import BigQuery
+
+    asks.init("trio")
+
     if credentials_file is None and credentials_blob is None:
         raise click.UsageError(
             "Must pass either --credentials-file or --credentials-blob"
@@ -183,6 +185,24 @@ def cli(log_level, log_file):
     show_default=True,
     help="How many bytes to read per recv.",
 )
+@click.option(
+    "--recv-buffer-bytes",
+    type=int,
+    metavar="BYTES",
+    help=(
+        "The size of the kernel receive buffer for incoming connections, capped by "
+        "net.core.rmem_max. If not given, the kernel will autotune it."
+    ),
+)
+@click.option(
+    "--reuse-port/--no-reuse-port",
+    default=False,
+    show_default=True,
+    help=(
+        "Allow multiple linehaul processes to listen on the same address and port, "
+        "with the kernel balancing connections between them (SO_REUSEPORT)."
+    ),
+)
 @click.option(
     "--cleanup-timeout",
     type=int,
@@ -234,6 +254,17 @@ def cli(log_level, log_file):
         "BigQuery."
     ),
 )
+@click.option(
+    "--retry-max-elapsed",
+    type=float,
+    default=300,
+    metavar="SECONDS",
+    show_default=True,
+    help=(
+        "The maximum length of time to spend retrying a batch to BigQuery before "
+        "dropping it."
+    ),
+)
 @click.option(
     "--retry-multiplier",
     type=float,
@@ -270,12 +301,15 @@ def server(
     token,
     max_line_size,
     recv_size,
+    recv_buffer_bytes,
+    reuse_port,
     cleanup_timeout,
     queued_events,
     batch_size,
     batch_timeout,
     retry_max_attempts,
     retry_max_wait,
+    retry_max_elapsed,
     retry_multiplier,
     api_timeout,
     api_max_connections,
@@ -287,6 +321,10 @@ def server(
 
     TABLE is a BigQuery table identifier of the form ProjectId.DataSetId.TableId.
     """
+    import trio
+
+    from linehaul.server import server as server_
+
     bq = _configure_bigquery(
         credentials_file, credentials_blob, api_max_connections=api_max_connections
     )
@@ -301,12 +339,15 @@ def server(
         token=token,
         max_line_size=max_line_size,
         recv_size=recv_size,
+        recv_buffer_bytes=recv_buffer_bytes,
+        reuse_port=reuse_port,
         cleanup_timeout=cleanup_timeout,
         qsize=queued_events,
         batch_size=batch_size,
         batch_timeout=batch_timeout,
         retry_max_attempts=retry_max_attempts,
         retry_max_wait=retry_max_wait,
+        retry_max_elapsed=retry_max_elapsed,
         retry_multiplier=retry_multiplier,
         api_timeout=api_timeout,
     ).items():
@@ -327,11 +368,14 @@ def server(
                 token=token,
                 max_line_size=max_line_size,
                 recv_size=recv_size,
+                recv_buffer_bytes=recv_buffer_bytes,
+                reuse_port=reuse_port,
                 qsize=queued_events,
                 batch_size=batch_size,
                 batch_timeout=batch_timeout,
                 retry_max_attempts=retry_max_attempts,
                 retry_max_wait=retry_max_wait,
+                retry_max_elapsed=retry_max_elapsed,
                 retry_multiplier=retry_multiplier,
                 api_timeout=api_timeout,
             ),
@@ -362,6 +406,11 @@ def migrate(credentials_file, credentials_blob, table):
 
     TABLE is a BigQuery table identifier of the form ProjectId.DataSetId.TableId.
     """
+    import importlib_resources
+    import trio
+
+    from linehaul.migration import migrate as migrate_
+
     bq = _configure_bigquery(credentials_file, credentials_blob)
     schema = json.loads(importlib_resources.read_text("linehaul", "schema.json"))
 
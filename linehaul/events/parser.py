@@ -11,19 +11,17 @@
 # limitations under the License.
 
 import enum
+import functools
 import logging
 import posixpath
+import re
+import sys
 
 from typing import Optional
 
 import arrow
 import attr
 import attr.validators
-import cattr
-
-from pyparsing import Literal as L, Word, Optional as OptionalItem
-from pyparsing import printables as _printables, restOfLine
-from pyparsing import ParseException
 
 from linehaul.ua import UserAgent, parser as user_agents
 
@@ -31,94 +29,96 @@ from linehaul.ua import UserAgent, parser as user_agents
 logger = logging.getLogger(__name__)
 
 
-_cattr = cattr.Converter()
-_cattr.register_structure_hook(
-    arrow.Arrow, lambda d, t: arrow.get(d[5:-4], "DD MMM YYYY HH:mm:ss")
+_MONTHS = {
+    "Jan": 1,
+    "Feb": 2,
+    "Mar": 3,
+    "Apr": 4,
+    "May": 5,
+    "Jun": 6,
+    "Jul": 7,
+    "Aug": 8,
+    "Sep": 9,
+    "Oct": 10,
+    "Nov": 11,
+    "Dec": 12,
+}
+
+
+# Our timestamps are always in the form "Fri, 20 Jul 2018 02:19:19 GMT", so rather than
+# have arrow tokenize a format string and match it for every event, we match the fixed
+# layout ourselves and pull the fields out of that.
+_TIMESTAMP = re.compile(
+    r"[A-Z][a-z]{2}, "
+    r"(?P<day>[0-9]{2}) (?P<month>[A-Z][a-z]{2}) (?P<year>[0-9]{4}) "
+    r"(?P<hour>[0-9]{2}):(?P<minute>[0-9]{2}):(?P<second>[0-9]{2}) GMT"
 )
 
 
-class UnparseableEvent(Exception):
-    pass
-
-
-class NullValue:
-    pass
-
-
-NullValue = NullValue()
-
-
-printables = "".join(set(_printables + " " + "\t") - {"|", "@"})
-
-PIPE = L("|").suppress()
-
-AT = L("@").suppress()
-
-NULL = L("(null)")
-NULL.setParseAction(lambda s, l, t: NullValue)
-
-TIMESTAMP = Word(printables)
-TIMESTAMP = TIMESTAMP.setResultsName("timestamp")
-TIMESTAMP.setName("Timestamp")
-
-COUNTRY_CODE = Word(printables)
-COUNTRY_CODE = COUNTRY_CODE.setResultsName("country_code")
-COUNTRY_CODE.setName("Country Code")
+def _parse_timestamp(value):
+    parsed = _TIMESTAMP.fullmatch(value)
+    if parsed is None or parsed.group("month") not in _MONTHS:
+        raise ValueError(f"Invalid timestamp: {value[:256]!r}")
 
-URL = Word(printables)
-URL = URL.setResultsName("url")
-URL.setName("URL")
-
-REQUEST = TIMESTAMP + PIPE + OptionalItem(COUNTRY_CODE) + PIPE + URL
-
-PROJECT_NAME = NULL | Word(printables)
-PROJECT_NAME = PROJECT_NAME.setResultsName("project_name")
-PROJECT_NAME.setName("Project Name")
-
-VERSION = NULL | Word(printables)
-VERSION = VERSION.setResultsName("version")
-VERSION.setName("Version")
-
-PACKAGE_TYPE = NULL | (
-    L("sdist")
-    | L("bdist_wheel")
-    | L("bdist_dmg")
-    | L("bdist_dumb")
-    | L("bdist_egg")
-    | L("bdist_msi")
-    | L("bdist_rpm")
-    | L("bdist_wininst")
-)
-PACKAGE_TYPE = PACKAGE_TYPE.setResultsName("package_type")
-PACKAGE_TYPE.setName("Package Type")
-
-PROJECT = PROJECT_NAME + PIPE + VERSION + PIPE + PACKAGE_TYPE
-
-TLS_PROTOCOL = NULL | Word(printables)
-TLS_PROTOCOL = TLS_PROTOCOL.setResultsName("tls_protocol")
-TLS_PROTOCOL.setName("TLS Protocol")
-
-TLS_CIPHER = NULL | Word(printables)
-TLS_CIPHER = TLS_CIPHER.setResultsName("tls_cipher")
-TLS_CIPHER.setName("TLS Cipher")
+    return arrow.Arrow(
+        int(parsed.group("year")),
+        _MONTHS[parsed.group("month")],
+        int(parsed.group("day")),
+        int(parsed.group("hour")),
+        int(parsed.group("minute")),
+        int(parsed.group("second")),
+    )
 
-TLS = TLS_PROTOCOL + PIPE + TLS_CIPHER
 
-USER_AGENT = restOfLine
-USER_AGENT = USER_AGENT.setResultsName("user_agent")
-USER_AGENT.setName("UserAgent")
+class UnparseableEvent(Exception):
+    pass
 
-V1_HEADER = OptionalItem(L("1").suppress() + AT)
 
-MESSAGE_v1 = V1_HEADER + REQUEST + PIPE + PROJECT + PIPE + USER_AGENT
-MESSAGE_v1.leaveWhitespace()
+NULL = "(null)"
+
+
+# Every field in an event is a run of printable ASCII characters (including spaces),
+# other than the "|" that separates the fields and the "@" that ends the version
+# header. Fields that may be null will be exactly "(null)" when they are, and nothing
+# else may start with "(null)".
+_FIELD = r"[ -?A-{}~]"
+_NULLABLE = rf"(?!\(null\){_FIELD}){_FIELD}+"
+
+_REQUEST = rf"""
+    (?P<timestamp>{_FIELD}+)
+    \|
+    (?P<country_code>{_FIELD}*)
+    \|
+    (?P<url>{_FIELD}+)
+"""
+
+_TLS = rf"""
+    (?P<tls_protocol>{_NULLABLE})
+    \|
+    (?P<tls_cipher>{_NULLABLE})
+"""
+
+_PROJECT = rf"""
+    (?P<project_name>{_NULLABLE})
+    \|
+    (?P<version>{_NULLABLE})
+    \|
+    (?P<package_type>
+        \(null\)|sdist|bdist_wheel|bdist_dmg|bdist_dumb|bdist_egg|bdist_msi|bdist_rpm
+        |bdist_wininst
+    )
+"""
 
-V2_HEADER = L("2").suppress() + AT
+# The user agent is the rest of the line, and anything following it may only be
+# whitespace.
+_USER_AGENT = r"""
+    (?P<user_agent>.*)
+    [\x20\t\r\n]*\Z
+"""
 
-MESSAGE_v2 = V2_HEADER + REQUEST + PIPE + TLS + PIPE + PROJECT + PIPE + USER_AGENT
-MESSAGE_v2.leaveWhitespace()
+MESSAGE_v1 = re.compile(rf"(?:1@)?{_REQUEST}\|{_PROJECT}\|{_USER_AGENT}", re.VERBOSE)
 
-MESSAGE = MESSAGE_v2 | MESSAGE_v1
+MESSAGE_v2 = re.compile(rf"2@{_REQUEST}\|{_TLS}\|{_PROJECT}\|{_USER_AGENT}", re.VERBOSE)
 
 
 @enum.unique
@@ -133,6 +133,18 @@ class PackageType(enum.Enum):
     sdist = "sdist"
 
 
+# Calling an Enum to look up a member by its value is surprisingly slow, so we build our
+# own mapping of values to members.
+_PACKAGE_TYPES = {t.value: t for t in PackageType}
+
+
+def _package_type(value):
+    try:
+        return _PACKAGE_TYPES[value]
+    except KeyError:
+        raise ValueError(f"{value!r} is not a valid PackageType") from None
+
+
 @attr.s(slots=True, frozen=True)
 class File:
 
@@ -163,40 +175,101 @@ class Download:
     details = attr.ib(type=Optional[UserAgent], default=None)
 
 
+# Sentinel returned from _parse_user_agent for a user agent that we don't know how to
+# parse, since exceptions are not cached by functools.lru_cache.
+_UNKNOWN_USER_AGENT = object()
+
+
+# User agents longer than this are never cached, since the cache keys come from our
+# clients and we don't want a handful of huge ones pinning a lot of memory.
+_MAX_CACHED_USER_AGENT_LENGTH = 512
+
+
+def _parse_user_agent_uncached(user_agent):
+    try:
+        return user_agents.parse(user_agent)
+    except user_agents.UnknownUserAgentError:
+        return _UNKNOWN_USER_AGENT
+
+
+# The same handful of user agents account for the vast majority of downloads, so we
+# cache the result of parsing them. The parsed UserAgent objects are immutable, so they
+# are safe to share between events.
+_parse_user_agent_cached = functools.lru_cache(maxsize=16384)(
+    _parse_user_agent_uncached
+)
+
+
+def _parse_user_agent(user_agent):
+    if len(user_agent) > _MAX_CACHED_USER_AGENT_LENGTH:
+        return _parse_user_agent_uncached(user_agent)
+    return _parse_user_agent_cached(user_agent)
+
+
 def _value_or_none(value):
-    if value is NullValue or value == "":
+    if value == NULL:
         return None
     else:
         return value
 
 
+def _intern(value):
+    # Some of our fields only ever have a small number of distinct values, so we intern
+    # them to share a single copy between every event that we have queued up.
+    if value is None:
+        return None
+    else:
+        return sys.intern(value)
+
+
 def parse(message):
-    try:
-        parsed = MESSAGE.parseString(message, parseAll=True)
-    except ParseException as exc:
-        raise UnparseableEvent("{!r} {}".format(message, exc)) from None
-
-    data = {}
-    data["timestamp"] = parsed.timestamp
-    data["tls_protocol"] = _value_or_none(parsed.tls_protocol)
-    data["tls_cipher"] = _value_or_none(parsed.tls_cipher)
-    data["country_code"] = _value_or_none(parsed.country_code)
-    data["url"] = parsed.url
-    data["file"] = {}
-    data["file"]["filename"] = posixpath.basename(parsed.url)
-    data["file"]["project"] = _value_or_none(parsed.project_name)
-    data["file"]["version"] = _value_or_none(parsed.version)
-    data["file"]["type"] = _value_or_none(parsed.package_type)
-
-    download = _cattr.structure(data, Download)
+    # Historically tabs were expanded to spaces before the event was parsed, so we keep
+    # doing that to avoid changing the events that we hand off.
+    if "\t" in message:
+        message = message.expandtabs()
+
+    # A version 2 event always starts with a 2@ header, and nothing that starts with
+    # one can be parsed as a version 1 event, so we only need to try one of them.
+    if message.startswith("2@"):
+        parsed = MESSAGE_v2.match(message)
+    else:
+        parsed = MESSAGE_v1.match(message)
+
+    if parsed is None:
+        # We only include the start of the event, this is going to end up in our logs.
+        raise UnparseableEvent("{!r}".format(message[:256]))
 
+    parsed = parsed.groupdict()
+
+    # We construct our objects directly, rather than building up a dictionary and
+    # structuring it with cattrs, since we already know exactly what goes where.
     try:
-        ua = user_agents.parse(parsed.user_agent)
-        if ua is None:
-            return  # Ignored user agents mean we'll skip trying to log this event
-    except user_agents.UnknownUserAgentError:
-        logging.info("Unknown User agent: %r", parsed.user_agent)
-    else:
-        download = attr.evolve(download, details=ua)
+        timestamp = _parse_timestamp(parsed["timestamp"])
+    except ValueError as exc:
+        raise UnparseableEvent(str(exc)) from None
+    file = File(
+        filename=posixpath.basename(parsed["url"]),
+        project=_value_or_none(parsed["project_name"]),
+        version=_value_or_none(parsed["version"]),
+        type=_package_type(_value_or_none(parsed["package_type"])),
+    )
+    # We parse the user agent before we create our Download, so that we can pass the
+    # details straight in, rather than having to copy our frozen Download to add them.
+    ua = _parse_user_agent(parsed["user_agent"])
+    if ua is None:
+        return  # Ignored user agents mean we'll skip trying to log this event
+    elif ua is _UNKNOWN_USER_AGENT:
+        logger.info("Unknown User agent: %r", parsed["user_agent"])
+        ua = None
+
+    download = Download(
+        timestamp=timestamp,
+        url=parsed["url"],
+        file=file,
+        tls_protocol=_intern(_value_or_none(parsed.get("tls_protocol"))),
+        tls_cipher=_intern(_value_or_none(parsed.get("tls_cipher"))),
+        country_code=_intern(parsed["country_code"] or None),
+        details=ua,
+    )
 
     return download
@@ -37,22 +37,40 @@ class LineReceiver:
     def receive_data(self, data):
         self._buffer += data
 
-        if len(self._buffer) > self._max_line_size:
-            raise BufferTooLargeError
-
+        # We limit the size of each individual line, rather than the size of the buffer
+        # as a whole, so that a single read can return many lines at once, no matter
+        # how the size of our reads compares to our maximum line size.
+        #
+        # Rather than deleting each line from the front of the buffer as we find it,
+        # which would shift the rest of the buffer down once per line, we track where
+        # the next line starts and only compact the buffer once we're done.
         lines = []
-        while True:
-            try:
-                found = self._buffer.index(b"\n", self._searched)
-            except ValueError:
-                self._searched = len(self._buffer)
-                break
-            else:
-                line = self._callback(self._buffer[: found + 1])
+        start = 0
+        try:
+            while True:
+                found = self._buffer.find(b"\n", max(start, self._searched))
+                if found == -1:
+                    break
+
+                if found + 1 - start > self._max_line_size:
+                    raise BufferTooLargeError
+
+                line = self._callback(self._buffer[start : found + 1])
                 if line is not None:
                     lines.append(line)
-                del self._buffer[: found + 1]
-                self._searched = 0
+                start = found + 1
+        finally:
+            del self._buffer[:start]
+            self._searched = 0
+
+        # Nothing left in the buffer contains a newline, so we don't need to search it
+        # again the next time we receive data.
+        self._searched = len(self._buffer)
+
+        # Whatever is left over is the start of a line that we haven't received all of
+        # yet, if that is already too large, then there's no point waiting for the rest.
+        if len(self._buffer) > self._max_line_size:
+            raise BufferTooLargeError
 
         return lines
 
@@ -10,8 +10,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hmac
 import itertools
 import logging
+import socket
 import ssl
 import uuid
 
@@ -37,7 +39,16 @@ retry = partial(tenacity.retry, sleep=trio.sleep)
 
 
 _cattr = cattr.Converter()
-_cattr.register_unstructure_hook(arrow.Arrow, lambda o: o.float_timestamp)
+# Register the property's getter directly, rather than wrapping it in a lambda, to save
+# a function call for every row we unstructure.
+_cattr.register_unstructure_hook(arrow.Arrow, arrow.Arrow.float_timestamp.fget)
+
+
+# BigQuery only uses the insertId to de-duplicate rows that were sent more than once
+# within a short window, so rather than generate a random UUID for every single row, we
+# generate one for the whole process and pair it with a counter.
+_INSERT_ID_PREFIX = uuid.uuid4().hex
+_insert_id_counter = itertools.count()
 
 
 #
@@ -51,11 +62,14 @@ def parse_line(line: bytes, token=None) -> Optional[_event_parser.Download]:
     #       we want to avoid things like decoding, etc introducing false postives or
     #       negatives for this check.
     if token is not None:
-        # TODO: Use a Constant Time Compare?
-        if not line.startswith(token):
+        if not hmac.compare_digest(line[: len(token)], token):
             return
         line = line[len(token) :]
 
+    return _parse_authenticated_line(line)
+
+
+def _parse_authenticated_line(line: bytes) -> Optional[_event_parser.Download]:
     # Now that we've authenticated the line, let's turn it into a str.
     line = line.decode("utf8", errors="replace")
 
@@ -65,23 +79,33 @@ def parse_line(line: bytes, token=None) -> Optional[_event_parser.Download]:
     except _syslog_parser.UnparseableSyslogMessage as exc:
         logger.error("Unparseable syslog message: %r", exc)
     except _event_parser.UnparseableEvent as exc:
-        logger.error("Unparseable event: %r, exc")
+        logger.error("Unparseable event: %r", exc)
     except Exception:
         logger.error("Unhandled error:", exc_info=True)
 
 
+def _next_insert_id():
+    return f"{_INSERT_ID_PREFIX}-{next(_insert_id_counter):x}"
+
+
 def extract_item_date(item):
-    return item.timestamp.format("YYYYMMDD")
+    # Arrow's format() tokenizes the format string on every call, so we format the
+    # underlying datetime directly. We avoid strftime here, because %Y isn't zero padded
+    # for years before 1000 on every platform.
+    dt = item.timestamp.datetime
+    return f"{dt.year:04}{dt.month:02}{dt.day:02}"
 
 
 def compute_batches(all_items):
-    for date, items in itertools.groupby(
-        sorted(all_items, key=extract_item_date), extract_item_date
-    ):
-        items = list(items)
-
-        yield extract_item_date(items[0]), [
-            {"insertId": str(uuid.uuid4()), "json": row}
+    # Bucket the items by date in a single pass, rather than sorting them and then
+    # grouping them, so that we only need to compute the date for each item once.
+    buckets = {}
+    for item in all_items:
+        buckets.setdefault(extract_item_date(item), []).append(item)
+
+    for date, items in buckets.items():
+        yield date, [
+            {"insertId": _next_insert_id(), "json": row}
             for row in _cattr.unstructure(items)
         ],
 
@@ -113,9 +137,42 @@ def log_retries(logger):
 #
 
 
+def listening_socket(bind, port, *, recv_buffer_bytes=None, reuse_port=False):
+    family, type_, proto, _, sockaddr = socket.getaddrinfo(
+        bind, port, type=socket.SOCK_STREAM, flags=socket.AI_PASSIVE
+    )[0]
+
+    sock = socket.socket(family, type_, proto)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # Allowing other sockets to bind to the same address and port lets us run
+        # multiple linehaul processes, and have the kernel balance incoming connections
+        # between them.
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+        # The receive buffer has to be set before we start listening, so that the kernel
+        # can take it into account when it negotiates the TCP window for every accepted
+        # connection (which inherit it from this socket). If we haven't been given one,
+        # then we leave it alone, which lets the kernel autotune it instead.
+        if recv_buffer_bytes is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_bytes)
+
+        sock.bind(sockaddr)
+        sock.listen(socket.SOMAXCONN)
+    except BaseException:
+        sock.close()
+        raise
+
+    return sock
+
+
 async def handle_connection(
-    stream, q, token=None, max_line_size=None, recv_size=None, cleanup_timeout=None
+    stream, q, parser=None, max_line_size=None, recv_size=None, cleanup_timeout=None
 ):
+    if parser is None:
+        parser = _parse_authenticated_line
     if recv_size is None:
         recv_size = 8192
     if cleanup_timeout is None:
@@ -126,15 +183,13 @@ async def handle_connection(
     # just log what we have.
     peer_id = uuid.uuid4()
     try:
-        real_stream = (
-            stream if hasattr(stream, "transport_stream") else stream.transport_stream
-        )
+        real_stream = getattr(stream, "transport_stream", stream)
         peer, *_ = real_stream.socket.getpeername()
     except (OSError, AttributeError):
         peer = "Unknown"
     logger.debug("{%s}: Connection received from %r.", peer_id, peer)
 
-    lr = LineReceiver(partial(parse_line, token=token), max_line_size=max_line_size)
+    lr = LineReceiver(parser, max_line_size=max_line_size)
 
     try:
         while True:
@@ -145,7 +200,15 @@ async def handle_connection(
 
             for event in lr.receive_data(data):
                 logger.log(log_SPEW, "{%s}: Received Event: %r", peer_id, event)
-                await q.put(event)
+
+                # Most of the time the queue has room, so we put the event directly to
+                # avoid yielding to the scheduler for every event in this chunk of data,
+                # and only wait on the queue if it is actually full. We'll still hit a
+                # checkpoint for every chunk of data when we go back to receive_some.
+                try:
+                    q.put_nowait(event)
+                except trio.WouldBlock:
+                    await q.put(event)
 
             if not data:
                 logger.debug("{%s}: Connection lost from %r.", peer_id, peer)
@@ -185,6 +248,7 @@ async def send_batch(
     *args,
     retry_max_attempts=None,
     retry_max_wait=None,
+    retry_max_elapsed=None,
     retry_multiplier=None,
     **kwargs
 ):
@@ -192,6 +256,8 @@ async def send_batch(
         retry_max_attempts = 10
     if retry_max_wait is None:
         retry_max_wait = 60
+    if retry_max_elapsed is None:
+        retry_max_elapsed = 300
     if retry_multiplier is None:
         retry_multiplier = 0.5
 
@@ -203,7 +269,13 @@ async def send_batch(
 
     send = actually_send_batch.retry_with(
         wait=tenacity.wait_exponential(multiplier=retry_multiplier, max=retry_max_wait),
-        stop=tenacity.stop_after_attempt(retry_max_attempts),
+        # We'll give up on a batch once we've either tried to send it too many times, or
+        # we've been trying for too long, so that a struggling BigQuery can't cause us
+        # to hold onto an ever growing number of batches in memory.
+        stop=tenacity.stop_any(
+            tenacity.stop_after_attempt(retry_max_attempts),
+            tenacity.stop_after_delay(retry_max_elapsed),
+        ),
     )
 
     try:
@@ -227,6 +299,7 @@ async def sender(
     batch_timeout=None,
     retry_max_attempts=None,
     retry_max_wait=None,
+    retry_max_elapsed=None,
     retry_multiplier=None,
     api_timeout=None
 ):
@@ -242,6 +315,15 @@ async def sender(
                 while len(batch) < batch_size:
                     batch.append(await q.get())
 
+                    # Once we've woken up for an event, drain anything else that has
+                    # already been queued without going back through the scheduler for
+                    # each individual item.
+                    while len(batch) < batch_size:
+                        try:
+                            batch.append(q.get_nowait())
+                        except trio.WouldBlock:
+                            break
+
             if batch and cancel_scope.cancelled_caught:
                 logger.debug("Batch timed out; Sending %d items.", len(batch))
             elif batch:
@@ -257,6 +339,7 @@ async def sender(
                         batch,
                         retry_max_attempts=retry_max_attempts,
                         retry_max_wait=retry_max_wait,
+                        retry_max_elapsed=retry_max_elapsed,
                         retry_multiplier=retry_multiplier,
                         api_timeout=api_timeout,
                     )
@@ -277,12 +360,15 @@ async def server(
     token=None,
     max_line_size=None,
     recv_size=None,
+    recv_buffer_bytes=None,
+    reuse_port=False,
     cleanup_timeout=None,
     qsize=10000,
     batch_size=None,
     batch_timeout=None,
     retry_max_attempts=None,
     retry_max_wait=None,
+    retry_max_elapsed=None,
     retry_multiplier=None,
     api_timeout=None,
     task_status=trio.TASK_STATUS_IGNORED,
@@ -311,26 +397,48 @@ async def server(
                 batch_timeout=batch_timeout,
                 retry_max_attempts=retry_max_attempts,
                 retry_max_wait=retry_max_wait,
+                retry_max_elapsed=retry_max_elapsed,
                 retry_multiplier=retry_multiplier,
                 api_timeout=api_timeout,
             )
         )
 
+        # Our line parser doesn't hold any per connection state, so rather than create
+        # a new one for every connection, we create it once and share it. When we don't
+        # have a token, we skip straight past the token check for every line.
+        if token is None:
+            parser = _parse_authenticated_line
+        else:
+            parser = partial(parse_line, token=token)
+
         handler = partial(
             handle_connection,
             q=q,
-            token=token,
+            parser=parser,
             max_line_size=max_line_size,
             recv_size=recv_size,
             cleanup_timeout=cleanup_timeout,
         )
-        if tls_certificate is None:
-            await nursery.start(trio.serve_tcp, handler, port)
-        else:
+        # We set up our listening socket ourselves, rather than letting trio do it for
+        # us, so that we can configure it before it starts to accept connections.
+        listener = trio.SocketListener(
+            trio.socket.from_stdlib_socket(
+                listening_socket(
+                    bind,
+                    port,
+                    recv_buffer_bytes=recv_buffer_bytes,
+                    reuse_port=reuse_port,
+                )
+            )
+        )
+
+        if tls_certificate is not None:
             ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
             ctx.load_cert_chain(tls_certificate)
 
-            await nursery.start(trio.serve_ssl_over_tcp, handler, port, ctx)
+            listener = trio.SSLListener(listener, ctx)
+
+        await nursery.start(trio.serve_listeners, handler, [listener])
 
         logging.info("Listening on %s:%d and sending to %r", bind, port, table)
         task_status.started()
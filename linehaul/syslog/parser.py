@@ -11,15 +11,12 @@
 # limitations under the License.
 
 import datetime
+import re
 
 import arrow
 import attr
 import attr.validators
 
-from pyparsing import Combine, Literal as L, Word
-from pyparsing import srange, restOfLine, printables
-from pyparsing import ParseException
-
 from . import Facility, Severity
 
 
@@ -27,52 +24,26 @@ class UnparseableSyslogMessage(Exception):
     pass
 
 
-class NilValue:
-    pass
-
-
-NilValue = NilValue()
-
-
-SP = L(" ").suppress()
-LANGLE = L("<").suppress()
-RANGLE = L(">").suppress()
-LBRACKET = L("[").suppress()
-RBRACKET = L("]").suppress()
-COLON = L(":").suppress()
-
-NIL = L("-")
-NIL.setName("Nil")
-NIL.setParseAction(lambda s, l, t: NilValue)
-
-PRIORITY = LANGLE + Word(srange("[0-9]"), min=1, max=3) + RANGLE  # 191 Max
-PRIORITY = PRIORITY.setResultsName("priority")
-PRIORITY.setName("Priority")
-PRIORITY.setParseAction(lambda s, l, t: int(t[0]))
-
-TIMESTAMP = Word(printables)
-TIMESTAMP = TIMESTAMP.setResultsName("timestamp")
-TIMESTAMP.setName("Timestamp")
-
-HOSTNAME = NIL ^ Word(printables)
-HOSTNAME = HOSTNAME.setResultsName("hostname")
-HOSTNAME.setName("Hostname")
-
-APPNAME = Word("".join(set(printables) - {"["}))
-APPNAME = APPNAME.setResultsName("appname")
-APPNAME.setName("AppName")
-
-PROCID = Combine(LBRACKET + Word("".join(set(printables) - {"]"})) + RBRACKET)
-PROCID = PROCID.setResultsName("procid")
-PROCID.setName("ProcID")
-
-HEADER = PRIORITY + TIMESTAMP + SP + HOSTNAME + SP + APPNAME + PROCID
-
-MESSAGE = restOfLine.setResultsName("message")
-MESSAGE.setName("Message")
-
-SYSLOG_MESSAGE = HEADER + COLON + SP + MESSAGE
-SYSLOG_MESSAGE.leaveWhitespace()
+# The syslog header is a fixed format, so rather than walk a general purpose grammar
+# for every line, we match the whole thing with a single precompiled regex. Each of the
+# header fields is a run of printable ASCII characters (!-~), with the exception that
+# the appname cannot contain a "[" and the procid cannot contain a "]". The message is
+# the rest of the line, and anything following it may only be whitespace.
+SYSLOG_MESSAGE = re.compile(
+    r"""
+    <(?P<priority>[0-9]{1,3})>                  # 191 Max
+    (?P<timestamp>[!-~]+)
+    \x20
+    (?P<hostname>[!-~]+)                        # A "-" is a Nil hostname
+    \x20
+    (?P<appname>[!-Z\\-~]+)                     # Printables, except "["
+    \[(?P<procid>[!-\\^-~]+)\]                  # Printables, except "]"
+    :\x20
+    (?P<message>.*)
+    [\x20\t\r\n]*\Z
+    """,
+    re.VERBOSE,
+)
 
 
 @attr.s(slots=True, frozen=True)
@@ -97,26 +68,28 @@ class SyslogMessage:
     message = attr.ib(type=str, validator=attr.validators.instance_of(str))
 
 
-def _value_or_none(value):
-    if value is NilValue:
-        return None
-    else:
-        return value
+def parse(message):
+    # Historically tabs were expanded to spaces before the line was parsed, so we keep
+    # doing that to avoid changing the messages that we hand off.
+    if "\t" in message:
+        message = message.expandtabs()
 
+    parsed = SYSLOG_MESSAGE.match(message)
+    if parsed is None:
+        # A bad line can be as long as our maximum line size, and this ends up in our
+        # logs, so we only include enough of it to identify what went wrong.
+        raise UnparseableSyslogMessage(f"Invalid syslog message: {message[:256]!r}")
 
-def parse(message):
-    try:
-        parsed = SYSLOG_MESSAGE.parseString(message, parseAll=True)
-    except ParseException as exc:
-        raise UnparseableSyslogMessage(str(exc)) from None
+    priority = int(parsed.group("priority"))
+    hostname = parsed.group("hostname")
 
     data = {}
-    data["facility"] = int(parsed.priority / 8)
-    data["severity"] = parsed.priority - (data["facility"] * 8)
-    data["timestamp"] = parsed.timestamp
-    data["hostname"] = _value_or_none(parsed.hostname)
-    data["appname"] = parsed.appname
-    data["procid"] = parsed.procid
-    data["message"] = parsed.message
+    data["facility"] = int(priority / 8)
+    data["severity"] = priority - (data["facility"] * 8)
+    data["timestamp"] = parsed.group("timestamp")
+    data["hostname"] = None if hostname == "-" else hostname
+    data["appname"] = parsed.group("appname")
+    data["procid"] = parsed.group("procid")
+    data["message"] = parsed.group("message")
 
     return SyslogMessage(**data)
@@ -30,6 +30,12 @@ class UnknownUserAgentError(ValueError):
     pass
 
 
+# Parsing a specifier set is relatively expensive, and these never change, so we only
+# do it once rather than for every user agent that we check against them.
+_PIP_6_SPECIFIER = SpecifierSet(">=6", prereleases=True)
+_PIP_1_4_SPECIFIER = SpecifierSet(">=1.4,<6", prereleases=True)
+
+
 # Note: This is a ParserSet, not a ParserList, parsers that have been registered with
 #       it may be called in any order. That means that all of our parsers need to be
 #       ordering independent.
@@ -47,7 +53,7 @@ def Pip6UserAgent(user_agent):
     # to only versions of pip newer than that.
     version_str = user_agent.split()[0].split("/", 1)[1]
     version = packaging.version.parse(version_str)
-    if version not in SpecifierSet(">=6", prereleases=True):
+    if version not in _PIP_6_SPECIFIER:
         raise UnableToParse
 
     try:
@@ -66,7 +72,7 @@ def Pip6UserAgent(user_agent):
 def Pip1_4UserAgent(*, version, impl_name, impl_version, system_name, system_release):
     # This format was brand new in pip 1.4, and went away in pip 6.0, so
     # we'll need to restrict it to only versions of pip between 1.4 and 6.0.
-    if version not in SpecifierSet(">=1.4,<6", prereleases=True):
+    if version not in _PIP_1_4_SPECIFIER:
         raise UnableToParse
 
     data = {"installer": {"name": "pip", "version": version}}
@@ -10,4 +10,151 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from linehaul.bigquery.client import BigQuery
+import json
+import time
+import urllib.parse
+
+import pytest
+import trio
+
+from linehaul.bigquery.client import (
+    BigQuery,
+    TokenFetchError,
+    _BigQueryAuthentication,
+    _table_url,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self.text = json.dumps(body if body is not None else {})
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def post(self, url, headers=None, data=None):
+        self.requests.append((url, headers, data))
+        return self.responses.pop(0)
+
+
+def _assertion(body):
+    return urllib.parse.parse_qs(body)["assertion"][0]
+
+
+def test_table_url():
+    assert _table_url("https://example.com", "project.dataset.table") == (
+        "https://example.com/bigquery/v2/projects/project/datasets/dataset/"
+        "tables/table"
+    )
+
+
+def test_table_url_invalid_target():
+    with pytest.raises(ValueError):
+        _table_url("https://example.com", "dataset.table")
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        FakeResponse(200, {"token_type": "Bearer", "expires_in": 3600}),
+        FakeResponse(500, {"error": "internal"}),
+    ],
+)
+def test_token_fetch_error(private_key, response):
+    auth = _BigQueryAuthentication(FakeSession(response), "account", private_key)
+
+    with pytest.raises(TokenFetchError) as excinfo:
+        trio.run(auth.get_token)
+
+    assert excinfo.value.status_code == response.status_code
+    assert excinfo.value.body == response.text
+    assert auth._client.access_token is None
+
+
+def test_failed_token_fetch_signs_new_assertion(private_key, monkeypatch):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    session = FakeSession(
+        FakeResponse(400, {"error": "invalid_grant"}),
+        FakeResponse(200, {"access_token": "token", "expires_in": 3600}),
+    )
+    auth = _BigQueryAuthentication(session, "account", private_key)
+
+    with pytest.raises(TokenFetchError):
+        trio.run(auth.get_token)
+
+    monkeypatch.setattr(time, "time", lambda: now + 1)
+    trio.run(auth.get_token)
+
+    (_, _, first), (_, _, second) = session.requests
+    assert _assertion(first) != _assertion(second)
+
+
+@pytest.mark.parametrize(
+    ("expires_in", "elapsed", "refreshed"),
+    [
+        (3600, 3600 - _BigQueryAuthentication._expiry_margin - 1, False),
+        (3600, 3600 - _BigQueryAuthentication._expiry_margin, True),
+        (None, 10 * 365 * 24 * 60 * 60, False),
+    ],
+)
+def test_authenticate_token_expiry(
+    private_key, monkeypatch, expires_in, elapsed, refreshed
+):
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+
+    body = {"access_token": "first"}
+    if expires_in is not None:
+        body["expires_in"] = expires_in
+    session = FakeSession(
+        FakeResponse(200, body), FakeResponse(200, {"access_token": "second"})
+    )
+    auth = _BigQueryAuthentication(session, "account", private_key)
+
+    _, headers, _ = trio.run(auth.authenticate, "https://example.com/")
+    assert headers["Authorization"] == "Bearer first"
+
+    monkeypatch.setattr(time, "time", lambda: now + elapsed)
+    _, headers, _ = trio.run(auth.authenticate, "https://example.com/")
+
+    expected = "second" if refreshed else "first"
+    assert headers["Authorization"] == f"Bearer {expected}"
+    assert len(session.requests) == (2 if refreshed else 1)
+
+
+@pytest.mark.parametrize("template_suffix", [None, "20180720"])
+@pytest.mark.parametrize(
+    "rows",
+    [[], [{"insertId": "1", "json": {"url": "/a"}}, {"insertId": "2", "json": {}}]],
+)
+def test_insert_all(private_key, template_suffix, rows):
+    session = FakeSession(FakeResponse(200))
+    bq = BigQuery("account", private_key)
+    bq._session = session
+    bq._auth._client.access_token = "token"
+
+    trio.run(bq.insert_all, "project.dataset.table", rows, template_suffix)
+
+    [(url, headers, body)] = session.requests
+    assert url == (
+        "https://www.googleapis.com/bigquery/v2/projects/project/datasets/dataset/"
+        "tables/table/insertAll"
+    )
+    assert headers["Content-Type"] == "application/json"
+    assert headers["Authorization"] == "Bearer token"
+    assert json.loads(body) == {
+        "kind": "bigquery#tableDataInsertAllRequest",
+        "skipInvalidRows": True,
+        "ignoreUnknownValues": True,
+        "templateSuffix": template_suffix,
+        "rows": rows,
+    }
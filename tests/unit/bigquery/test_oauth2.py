@@ -0,0 +1,72 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import base64
+import json
+import urllib.parse
+
+import pytest
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+
+from linehaul.bigquery.oauth2 import ServiceApplicationClient
+
+
+def _assertion(body):
+    return urllib.parse.parse_qs(body)["assertion"][0]
+
+
+def test_requires_key():
+    client = ServiceApplicationClient("client", issuer="iss", audience="aud")
+
+    with pytest.raises(ValueError):
+        client.prepare_request_body()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def test_assertion_is_signed_jwt(private_key):
+    client = ServiceApplicationClient(
+        "client", private_key=private_key, issuer="iss", audience="aud"
+    )
+
+    assertion = _assertion(
+        client.prepare_request_body(
+            scope="scope", issued_at=1000, expires_at=2000, jwt_id="abc"
+        )
+    )
+    header, payload, signature = assertion.split(".")
+
+    assert json.loads(_b64decode(header)) == {"alg": "RS256", "typ": "JWT"}
+    assert json.loads(_b64decode(payload)) == {
+        "iss": "iss",
+        "aud": "aud",
+        "sub": None,
+        "iat": 1000,
+        "exp": 2000,
+        "scope": "scope",
+        "jti": "abc",
+    }
+
+    public_key = serialization.load_pem_private_key(
+        private_key.encode("utf8"), password=None, backend=default_backend()
+    ).public_key()
+    public_key.verify(
+        _b64decode(signature),
+        f"{header}.{payload}".encode("ascii"),
+        padding.PKCS1v15(),
+        hashes.SHA256(),
+    )
@@ -19,22 +19,35 @@ import yaml
 
 from hypothesis import given, strategies as st
 
-from linehaul.events.parser import Download, UnparseableEvent, parse, _cattr
+from linehaul.events.parser import (
+    Download,
+    UnparseableEvent,
+    parse,
+    _parse_user_agent,
+    _parse_user_agent_cached,
+)
+
+from ...converters import converter
 
 
 FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
 
+# Prefer the libyaml backed loader when it's available, it's considerably faster than
+# the pure Python one for our fixture files. Our fixtures reference exception types
+# with !!python/name, so this can't be one of the safe loaders.
+_YamlLoader = getattr(yaml, "CLoader", yaml.Loader)
+
 
 def _load_event_fixtures(fixture_dir):
     fixtures = os.listdir(fixture_dir)
     for filename in fixtures:
         with open(os.path.join(fixture_dir, filename), "r") as fp:
-            fixtures = yaml.load(fp.read())
+            fixtures = yaml.load(fp, Loader=_YamlLoader)
         for fixture in fixtures:
             event = fixture.pop("event")
             result = fixture.pop("result")
             expected = (
-                _cattr.structure(result, Download)
+                converter.structure(result, Download)
                 if isinstance(result, dict)
                 else result
             )
@@ -55,3 +68,14 @@ def test_download_parsing(event_data, expected):
 def test_invalid_event(data):
     with pytest.raises(UnparseableEvent):
         parse(data)
+
+
+@pytest.mark.parametrize(
+    ("user_agent", "cached"),
+    [("pip/18.0", True), ("pip/18.0 " + "x" * 1024, False)],
+)
+def test_caches_only_short_user_agents(user_agent, cached):
+    _parse_user_agent_cached.cache_clear()
+    _parse_user_agent(user_agent)
+
+    assert _parse_user_agent_cached.cache_info().currsize == (1 if cached else 0)
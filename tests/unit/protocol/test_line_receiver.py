@@ -53,6 +53,23 @@ def test_too_large_line_raises(max_line_size, over_by):
         lr.receive_data(bytes(lr._max_line_size + over_by))
 
 
+@given(max_line_size | st.none(), st.integers(min_value=1, max_value=20))
+def test_too_large_terminated_line_raises(max_line_size, over_by):
+    lr = LineReceiver(lambda line: line, max_line_size=max_line_size)
+
+    with pytest.raises(BufferTooLargeError):
+        lr.receive_data(bytes(lr._max_line_size + over_by - 1) + b"\n")
+
+
+@given(line_delimited_data(max_line_size=st.just(512), min_lines=2))
+def test_receives_more_than_max_line_size(data):
+    lines = [i + b"\n" for i in data.split(b"\n")[:-1]]
+    lr = LineReceiver(lambda line: line, max_line_size=max(map(len, lines)))
+
+    assert lr.receive_data(data) == lines
+    lr.close()
+
+
 @given(st.binary(min_size=1, max_size=512).filter(lambda i: i[-1:] != b"\n"))
 def test_truncated_line_raises(truncated_data):
     lr = LineReceiver(lambda line: line)
@@ -11,8 +11,8 @@
 # limitations under the License.
 
 import datetime
+import string
 
-import pyparsing
 import pytest
 
 from hypothesis import example, given, strategies as st
@@ -21,6 +21,10 @@ from linehaul.syslog import Facility, Severity
 from linehaul.syslog.parser import SyslogMessage, UnparseableSyslogMessage, parse
 
 
+# Every printable ASCII character other than whitespace.
+PRINTABLES = "".join(c for c in string.printable if not c.isspace())
+
+
 def _unparse_syslog_message(sm):
     pri = (sm.facility.value * 8) + sm.severity.value
     timestamp = sm.timestamp.isoformat()
@@ -34,17 +38,17 @@ def _unparse_syslog_message(sm):
         timestamp=st.datetimes(),
         hostname=(
             st.none()
-            | st.text(alphabet=pyparsing.printables, min_size=1, max_size=100).filter(
+            | st.text(alphabet=PRINTABLES, min_size=1, max_size=100).filter(
                 lambda i: i != "-"
             )
         ),
         appname=st.text(
-            alphabet=list(set(pyparsing.printables) - set("[]")),
+            alphabet=list(set(PRINTABLES) - set("[]")),
             min_size=1,
             max_size=100,
         ),
         procid=st.text(
-            alphabet=list(set(pyparsing.printables) - set("[]")),
+            alphabet=list(set(PRINTABLES) - set("[]")),
             min_size=1,
             max_size=100,
         ),
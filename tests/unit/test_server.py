@@ -12,6 +12,7 @@
 
 import datetime
 import logging
+import socket
 
 from unittest.mock import ANY
 
@@ -20,8 +21,15 @@ import pytest
 
 from hypothesis import given, strategies as st
 
-from linehaul.events.parser import Download, _cattr
-from linehaul.server import compute_batches, extract_item_date, parse_line
+from linehaul.events.parser import Download
+from linehaul.server import (
+    compute_batches,
+    extract_item_date,
+    listening_socket,
+    parse_line,
+)
+
+from ..converters import converter
 
 
 class TestParseLine:
@@ -109,7 +117,7 @@ class TestParseLine:
         )
         line = "<134>2018-07-20T02:19:20Z cache-itm18828 linehaul[411617]: " + event
 
-        expected = _cattr.structure(
+        expected = converter.structure(
             {
                 "country_code": "JP",
                 "details": {"installer": {"name": "bandersnatch", "version": "2.2.1"}},
@@ -174,3 +182,22 @@ def test_compute_batches(events):
 
     assert len(ids) == len(events)
     assert total_events == len(events)
+
+
+class TestListeningSocket:
+    def test_listens(self):
+        with listening_socket("127.0.0.1", 0) as sock:
+            assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_ACCEPTCONN)
+            assert sock.getsockname()[0] == "127.0.0.1"
+
+    def test_recv_buffer_bytes(self):
+        with listening_socket("127.0.0.1", 0, recv_buffer_bytes=65536) as sock:
+            # The kernel is free to adjust the size we asked for (Linux doubles it to
+            # account for its own bookkeeping), but it should be at least what we set.
+            assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) >= 65536
+
+    def test_reuse_port(self):
+        with listening_socket("127.0.0.1", 0, reuse_port=True) as first:
+            port = first.getsockname()[1]
+            with listening_socket("127.0.0.1", port, reuse_port=True) as second:
+                assert second.getsockname()[1] == port
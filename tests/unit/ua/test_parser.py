@@ -27,12 +27,16 @@ from ...strategies import version as st_version
 
 FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
 
+# Prefer the libyaml backed loader when it's available, it's considerably faster than
+# the pure Python one for our fixture files.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def _load_ua_fixtures(fixture_dir):
     fixtures = os.listdir(fixture_dir)
     for filename in fixtures:
         with open(os.path.join(fixture_dir, filename), "r") as fp:
-            fixtures = yaml.safe_load(fp.read())
+            fixtures = yaml.load(fp, Loader=_YamlLoader)
         for fixture in fixtures:
             ua = fixture.pop("ua")
             result = fixture.pop("result")